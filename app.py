@@ -1,25 +1,18 @@
 
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
+import numpy as np
 from io import BytesIO
+import calendar
+import importlib.util
 from datetime import datetime, date, timedelta
 
-# Optional dependency for PDF export
-try:
-    from reportlab.lib.pagesizes import A4
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.units import cm
-    from reportlab.lib.utils import ImageReader
-    REPORTLAB_OK = True
-except Exception:
-    REPORTLAB_OK = False
+# Optional dependency for PDF export; imported lazily in the PDF handler
+REPORTLAB_OK = importlib.util.find_spec("reportlab") is not None
 
 st.set_page_config(page_title="Universal Budget Dashboard", layout="wide")
 
 # ---------- Session State ----------
-if "data" not in st.session_state:
-    st.session_state.data = pd.DataFrame(columns=["Month","Date","Category","Type","Budget (€)","Actual (€)","Section"])
 if "categories" not in st.session_state:
     st.session_state.categories = pd.DataFrame({
         "Category": ["Salary","Other Income","Rent","Insurance","Phone","Debts",
@@ -28,6 +21,16 @@ if "categories" not in st.session_state:
         "Type": ["Income","Income","Expense","Expense","Expense","Expense","Expense","Expense","Expense","Expense","Expense","Expense","Expense","Expense","Expense","Expense"],
         "Section": ["Savings","Savings","Needs","Needs","Needs","Needs","Wants","Wants","Wants","Wants","Wants","Needs","Needs","Needs","Wants","Wants"]
     })
+if "data" not in st.session_state:
+    st.session_state.data = pd.DataFrame({
+        "Month": pd.Series(dtype=object),
+        "Date": pd.Series(dtype="datetime64[ns]"),
+        "Category": pd.Categorical([], categories=st.session_state.categories["Category"].unique()),
+        "Type": pd.Categorical([], categories=["Income","Expense"]),
+        "Budget (€)": pd.Series(dtype="float64"),
+        "Actual (€)": pd.Series(dtype="float64"),
+        "Section": pd.Categorical([], categories=["Needs","Wants","Savings"]),
+    })
 if "budgets" not in st.session_state:
     st.session_state.budgets = pd.DataFrame({"Category": st.session_state.categories["Category"], "Monthly Budget (€)": [0]*len(st.session_state.categories)})
 if "settings" not in st.session_state:
@@ -44,43 +47,174 @@ if "settings" not in st.session_state:
     }
 
 # ---------- Helpers ----------
+def col_dict(df, k, v):
+    return dict(zip(df[k].to_numpy(), df[v].to_numpy()))
+
 def ensure_columns(df):
+    # Pure: returns a new frame and leaves the caller's df untouched
     cols = ["Month","Date","Category","Type","Budget (€)","Actual (€)","Section"]
-    for c in cols:
-        if c not in df.columns:
-            df[c] = None
-    # Coerce
-    df["Month"] = df["Month"].fillna(st.session_state.settings["default_month"]).astype(str).str.slice(0,7)
-    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-    df["Category"] = df["Category"].astype(str)
-    df["Type"] = df["Type"].str.title()
-    for c in ["Budget (€)","Actual (€)"]:
-        df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0.0)
+    df = df.assign(**{c: None for c in cols if c not in df.columns})
+    # Coerce; columns already in their target dtype (e.g. from read_upload) skip the conversion
+    date = df["Date"] if pd.api.types.is_datetime64_any_dtype(df["Date"]) else pd.to_datetime(df["Date"], errors="coerce")
+    amounts = {c: (df[c] if pd.api.types.is_float_dtype(df[c])
+                   else pd.to_numeric(df[c], errors="coerce").astype("float64")).fillna(0.0)
+               for c in ["Budget (€)","Actual (€)"]}
+    # Low-cardinality labels as categoricals: masks compare int codes, not strings
+    category = df["Category"]
+    if not isinstance(category.dtype, pd.CategoricalDtype):
+        category = category.astype(str).astype("category")
     # Section from categories map if missing
-    cat_map = st.session_state.categories.set_index("Category")["Section"].to_dict()
-    df["Section"] = df.apply(lambda r: cat_map.get(r["Category"], r.get("Section","")), axis=1)
-    return df
+    section = category.astype(object).map(cat_section_map)
+    section = section.where(section.notna(), df["Section"].astype(object).fillna(""))
+    return df.assign(**{
+        "Month": df["Month"].fillna(st.session_state.settings["default_month"]).astype(str).str.slice(0,7),
+        "Date": date,
+        "Category": category,
+        "Type": df["Type"].str.title().astype("category"),
+        **amounts,
+        "Section": section.astype("category"),
+    })
 
-def aggregate_monthly(df):
-    m = df.assign(
-        Income=df.apply(lambda r: r["Actual (€)"] if r["Type"]=="Income" else 0, axis=1),
-        Expense=df.apply(lambda r: r["Actual (€)"] if r["Type"]=="Expense" else 0, axis=1)
-    ).groupby("Month", as_index=False)[["Income","Expense"]].sum().sort_values("Month")
-    m["Savings"] = m["Income"] - m["Expense"]
-    return m
+UPLOAD_DTYPES = {"Month": "string", "Category": "category", "Type": "category", "Section": "category",
+                 "Budget (€)": "float64", "Actual (€)": "float64"}
 
+def read_upload(f):
+    reader = pd.read_csv if f.name.lower().endswith(".csv") else pd.read_excel
+    try:
+        # Explicit dtypes skip inference; dtype entries for absent columns are ignored
+        return reader(f, dtype=UPLOAD_DTYPES)
+    except ValueError:
+        # Messy values (e.g. "20€"): read untyped and let ensure_columns coerce
+        f.seek(0)
+        return reader(f)
+
+def aggregate_monthly(df):
+    m = (df.pivot_table(index="Month", columns="Type", values="Actual (€)", aggfunc="sum", fill_value=0, observed=True, sort=False)
+         .reindex(columns=["Income","Expense"], fill_value=0)
+         .rename_axis(columns=None)
+         .reset_index())
+    m.eval("Savings = Income - Expense", inplace=True)
+    return m.sort_values("Month")
+
+def label_mask(df, col, label):
+    # Boolean ndarray from the categorical's int codes instead of a string compare;
+    # a label missing from the categories matches nothing (-1 is NaN, so use -2)
+    cats = df[col].cat.categories
+    code = cats.get_loc(label) if label in cats else -2
+    return df[col].cat.codes.to_numpy() == code
+
+def guardrail_breaches(budgets, actuals, caps, today_in_month):
+    # One vectorized pass over per-category arrays aligned by position (cap 0 = no cap).
+    # Returns (overall 80%-before-the-20th breach, per-category hard-cap breach mask).
+    total_budget = budgets.sum()
+    overall = bool(total_budget > 0 and today_in_month < 20 and actuals.sum() > 0.8 * total_budget)
+    return overall, (caps > 0) & (actuals > caps)
+
+def frame_key(df):
+    # Cheap content fingerprint used as the st.cache_data key for DataFrames
+    return (len(df), tuple(df.columns), int(pd.util.hash_pandas_object(df).sum()))
+
+@st.cache_data(show_spinner=False, max_entries=16, ttl=3600)
+def cached_ensure_columns(key, default_month, cats_key, _df):
+    # default_month/cats_key are part of the key because ensure_columns reads them from session state
+    return ensure_columns(_df)
+
+@st.cache_data(show_spinner=False, max_entries=16, ttl=3600)
+def cached_aggregate_monthly(key, _df):
+    return aggregate_monthly(_df)
+
+def prepared_data():
+    df = st.session_state.data
+    return cached_ensure_columns(frame_key(df), st.session_state.settings["default_month"],
+                                 frame_key(st.session_state.categories), df)
+
+@st.cache_data(show_spinner=False, max_entries=16, ttl=3600)
+def cached_month_slice(key, month, budgets_key, _df, _budgets):
+    # Current-month rows with budgets taken from the per-category settings where set;
+    # the map is built from _budgets so it always matches budgets_key
+    bmap = col_dict(_budgets, "Category", "Monthly Budget (€)")
+    dfm = _df[_df["Month"]==month].copy()
+    dfm["Budget (€)"] = dfm["Category"].map(bmap).astype(float).fillna(dfm["Budget (€)"])
+    return dfm
+
+# matplotlib is only needed for the PDF charts, so it is imported on first use
 def fig_to_png_bytes(fig):
+    import matplotlib.pyplot as plt
     buf = BytesIO()
     fig.savefig(buf, format="png", bbox_inches="tight")
     plt.close(fig)
     buf.seek(0)
     return buf.getvalue()
 
+def trend_figure(monthly):
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots()
+    ax.plot(monthly["Month"], monthly["Income"], label="Income")
+    ax.plot(monthly["Month"], monthly["Expense"], label="Expenses")
+    ax.plot(monthly["Month"], monthly["Savings"], label="Savings")
+    ax.set_xlabel("Month")
+    ax.set_ylabel("€")
+    ax.legend()
+    plt.xticks(rotation=45)
+    return fig
+
+def variance_figure(exp_only):
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots()
+    exp_sorted = exp_only.sort_values("Variance (€)")
+    ax.barh(exp_sorted["Category"], exp_sorted["Variance (€)"])
+    ax.axvline(0, linewidth=1)
+    ax.set_xlabel("€")
+    return fig
+
+def pie_figure(exp_only):
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots()
+    if not exp_only.empty:
+        ax.pie(exp_only["Actual (€)"], labels=exp_only["Category"], autopct="%1.1f%%", startangle=90)
+    ax.axis("equal")
+    return fig
+
+def trend_chart_data(monthly):
+    # Wide Month-indexed frame for st.line_chart, labelled like the PDF trend chart
+    return monthly.set_index("Month")[["Income","Expense","Savings"]].rename(columns={"Expense": "Expenses"})
+
+# Vega-Lite specs for the on-screen charts; explicit sorts keep the PDF ordering
+# (st.bar_chart would sort nominal labels alphabetically)
+VARIANCE_SPEC = {
+    "layer": [
+        {"mark": "bar",
+         "encoding": {"y": {"field": "Category", "type": "nominal", "sort": {"field": "Variance (€)", "order": "ascending"}},
+                      "x": {"field": "Variance (€)", "type": "quantitative", "title": "€"}}},
+        {"mark": "rule", "encoding": {"x": {"datum": 0}}},
+    ],
+}
+
+def ordered_bar_chart(values):
+    # Bars in the dict's order, e.g. Needs/Wants/Savings
+    labels = list(values)
+    st.vega_lite_chart(pd.DataFrame({"Label": labels, "€": list(values.values())}), {
+        "mark": "bar",
+        "encoding": {"x": {"field": "Label", "type": "nominal", "sort": labels, "title": None},
+                     "y": {"field": "€", "type": "quantitative"}},
+    }, use_container_width=True)
+
+REPORT_CHARTS = {"trend": trend_figure, "variance": variance_figure, "pie": pie_figure}
+
+@st.cache_data(show_spinner=False, max_entries=16, ttl=3600)
+def report_chart_png(key, kind, _df):
+    # Rendered once per (data version, chart) for the PDF export
+    return fig_to_png_bytes(REPORT_CHARTS[kind](_df))
+
 def current_month_key(df):
     if df.empty:
         return st.session_state.settings["default_month"]
     return df["Month"].iloc[-1]
 
+# Category lookups, built once per rerun and shared by all tabs
+cat_section_map = col_dict(st.session_state.categories, "Category", "Section")
+cat_budget_map = col_dict(st.session_state.budgets, "Category", "Monthly Budget (€)")
+
 # ---------- Navigation ----------
 st.title("🏠 Universal Budget Dashboard")
 tabs = st.tabs(["Home", "Budget & Entries", "Analytics", "Reports", "Settings"])
@@ -100,13 +234,16 @@ with tabs[0]:
             newcats.columns = [c.strip() for c in newcats.columns]
             if {"Category","Type","Section"}.issubset(newcats.columns):
                 st.session_state.categories = newcats
+                cat_section_map = col_dict(newcats, "Category", "Section")
                 st.success("Categories updated.")
 
     # Budgets editor
     with st.expander("💶 Set monthly budgets per category"):
-        merged = pd.merge(st.session_state.categories[["Category"]], st.session_state.budgets, on="Category", how="left")
+        merged = (st.session_state.budgets.drop_duplicates("Category").set_index("Category")
+                  .reindex(st.session_state.categories["Category"]).reset_index())
         merged["Monthly Budget (€)"] = merged["Monthly Budget (€)"].fillna(0)
         st.session_state.budgets = merged
+        cat_budget_map = col_dict(merged, "Category", "Monthly Budget (€)")
         st.dataframe(st.session_state.budgets, use_container_width=True)
 
     # Quick entry form
@@ -120,11 +257,10 @@ with tabs[0]:
             entry_type = st.selectbox("Type", options=["Income","Expense"], index=1 if entry_category not in ["Salary","Other Income"] else 0)
             entry_amount_actual = st.number_input("Actual (€)", min_value=0.0, value=0.0, step=10.0)
         with right:
-            cat_budget = st.session_state.budgets.set_index("Category")["Monthly Budget (€)"].to_dict()
-            suggested = float(cat_budget.get(entry_category, 0))
+            suggested = float(cat_budget_map.get(entry_category, 0))
             entry_amount_budget = st.number_input("Budget (€) for this category", min_value=0.0, value=suggested, step=10.0)
             entry_section = st.selectbox("Section (50/30/20)", options=["Needs","Wants","Savings"], index=["Needs","Wants","Savings"].index(
-                st.session_state.categories.set_index("Category").loc[entry_category,"Section"]
+                cat_section_map[entry_category]
             ))
         submitted = st.form_submit_button("Add Entry")
         if submitted:
@@ -137,7 +273,7 @@ with tabs[0]:
                 "Actual (€)": entry_amount_actual,
                 "Section": entry_section
             }])
-            st.session_state.data = pd.concat([st.session_state.data, new_row], ignore_index=True)
+            st.session_state.data = ensure_columns(pd.concat([st.session_state.data, new_row], ignore_index=True))
             st.success("Entry added.")
 
     st.markdown("---")
@@ -146,31 +282,34 @@ with tabs[0]:
     with c1:
         uploaded = st.file_uploader("Upload CSV/XLSX data", type=["csv","xlsx"], key="data_up")
         if uploaded:
-            if uploaded.name.lower().endswith(".csv"):
-                df = pd.read_csv(uploaded)
-            else:
-                df = pd.read_excel(uploaded)
-            df = ensure_columns(df)
-            st.session_state.data = pd.concat([st.session_state.data, df], ignore_index=True)
+            df = read_upload(uploaded)
+            # Re-cast after the concat so the stored frame keeps its categorical dtypes
+            st.session_state.data = ensure_columns(pd.concat([st.session_state.data, df], ignore_index=True))
             st.success(f"Imported {len(df)} rows.")
     with c2:
-        st.download_button("Download current data (CSV)",
-                           st.session_state.data.to_csv(index=False).encode("utf-8"),
-                           "budget_data.csv", "text/csv")
+        csv_buf = BytesIO()
+        st.session_state.data.to_csv(csv_buf, index=False, encoding="utf-8")
+        st.download_button("Download current data (CSV)", csv_buf.getvalue(), "budget_data.csv", "text/csv")
+
+# ---------- Shared data for the remaining tabs ----------
+# Built after Home so entries added or imported in this run are included
+data = prepared_data()
+data_key = frame_key(data)
+cm = current_month_key(data)
+dfm = cached_month_slice(data_key, cm, frame_key(st.session_state.budgets), data, st.session_state.budgets)
 
 # ---------- BUDGET & ENTRIES TAB ----------
 with tabs[1]:
     st.header("Budget & Entries")
-    data = ensure_columns(st.session_state.data.copy())
     if data.empty:
         st.info("No data yet. Add entries in Home.")
     else:
         st.dataframe(data.sort_values(["Month","Date"], na_position="last"), use_container_width=True)
 
-        cm = current_month_key(data)
-        dfm = data[data["Month"]==cm].copy()
-        month_income = dfm.loc[dfm["Type"]=="Income","Actual (€)"].sum()
-        month_expenses = dfm.loc[dfm["Type"]=="Expense","Actual (€)"].sum()
+        is_income, is_expense = label_mask(dfm, "Type", "Income"), label_mask(dfm, "Type", "Expense")
+        amounts = dfm["Actual (€)"].to_numpy()
+        month_income = amounts[is_income].sum(dtype=np.float64)
+        month_expenses = amounts[is_expense].sum(dtype=np.float64)
         month_savings = month_income - month_expenses
         month_savings_rate = (month_savings / month_income * 100) if month_income>0 else 0
 
@@ -180,9 +319,7 @@ with tabs[1]:
         k3.metric("💰 Savings", f"{month_savings:,.0f}€")
         k4.metric("📈 Savings Rate", f"{month_savings_rate:.1f}%")
 
-        bmap = st.session_state.budgets.set_index("Category")["Monthly Budget (€)"].to_dict()
-        dfm["Budget (€)"] = dfm["Category"].map(bmap).fillna(dfm["Budget (€)"])
-        cat_sum = dfm.groupby(["Category","Type","Section"], as_index=False)[["Budget (€)","Actual (€)"]].sum()
+        cat_sum = dfm.groupby(["Category","Type","Section"], as_index=False, sort=False, observed=True)[["Budget (€)","Actual (€)"]].sum()
         cat_sum["Variance (€)"] = cat_sum["Budget (€)"] - cat_sum["Actual (€)"]
         cat_sum.loc[cat_sum["Type"]=="Income", ["Budget (€)","Variance (€)"]] = 0
         st.subheader(f"Categories — {cm}")
@@ -191,148 +328,108 @@ with tabs[1]:
 # ---------- ANALYTICS TAB ----------
 with tabs[2]:
     st.header("Analytics")
-    data = ensure_columns(st.session_state.data.copy())
     if data.empty:
         st.info("No data yet.")
     else:
-        monthly = aggregate_monthly(data)
+        monthly = cached_aggregate_monthly(data_key, data)
 
         st.subheader("📆 Monthly Trend (Income, Expenses, Savings)")
         if not monthly.empty:
-            fig1, ax1 = plt.subplots()
-            ax1.plot(monthly["Month"], monthly["Income"], label="Income")
-            ax1.plot(monthly["Month"], monthly["Expense"], label="Expenses")
-            ax1.plot(monthly["Month"], monthly["Savings"], label="Savings")
-            ax1.set_xlabel("Month")
-            ax1.set_ylabel("€")
-            ax1.legend()
-            plt.xticks(rotation=45)
-            st.pyplot(fig1)
+            st.line_chart(trend_chart_data(monthly), x_label="Month", y_label="€")
 
         st.subheader("📐 50/30/20 View (Needs/Wants/Savings) — current month")
-        cm = current_month_key(data)
-        dfm = data[data["Month"]==cm].copy()
-        month_income = dfm.loc[dfm["Type"]=="Income","Actual (€)"].sum()
-        by_sec = dfm[dfm["Type"]=="Expense"].groupby("Section", as_index=False)["Actual (€)"].sum()
+        is_expense = label_mask(dfm, "Type", "Expense")
+        month_income = dfm["Actual (€)"].to_numpy()[label_mask(dfm, "Type", "Income")].sum(dtype=np.float64)
+        by_sec = dfm[is_expense].groupby("Section", as_index=False, sort=False, observed=True)["Actual (€)"].sum()
         needs = float(by_sec.loc[by_sec["Section"]=="Needs","Actual (€)"].sum())
         wants = float(by_sec.loc[by_sec["Section"]=="Wants","Actual (€)"].sum())
         savings = max(0.0, month_income - (needs + wants))
         st.write(f"Income: {month_income:,.0f}€ | Needs: {needs:,.0f}€ | Wants: {wants:,.0f}€ | Savings: {savings:,.0f}€")
-        fig2, ax2 = plt.subplots()
-        ax2.bar(["Needs","Wants","Savings"], [needs, wants, savings])
-        ax2.set_ylabel("€")
-        st.pyplot(fig2)
+        ordered_bar_chart({"Needs": needs, "Wants": wants, "Savings": savings})
 
         st.subheader("⚠️ Variance by Category (Budget - Actual) — current month")
-        bmap = st.session_state.budgets.set_index("Category")["Monthly Budget (€)"].to_dict()
-        dfm["Budget (€)"] = dfm["Category"].map(bmap).fillna(dfm["Budget (€)"])
-        exp_only = dfm[dfm["Type"]=="Expense"].groupby("Category", as_index=False)[["Budget (€)","Actual (€)"]].sum()
+        exp_only = dfm[is_expense].groupby("Category", as_index=False, sort=False, observed=True)[["Budget (€)","Actual (€)"]].sum()
         exp_only["Variance (€)"] = exp_only["Budget (€)"] - exp_only["Actual (€)"]
-        exp_sorted = exp_only.sort_values("Variance (€)")
-        fig3, ax3 = plt.subplots()
-        ax3.barh(exp_sorted["Category"], exp_sorted["Variance (€)"])
-        ax3.axvline(0, linewidth=1)
-        ax3.set_xlabel("€")
-        st.pyplot(fig3)
+        st.vega_lite_chart(exp_only, VARIANCE_SPEC, use_container_width=True)
 
         st.subheader("📈 3-Month Rolling Average (Food, Clothing)")
         keycats = ["Restaurant & Food Delivery","Clothing"]
-        dfk = data[(data["Type"]=="Expense") & (data["Category"].isin(keycats))].copy()
+        dfk = data[label_mask(data, "Type", "Expense") & data["Category"].isin(keycats).to_numpy()]
         if not dfk.empty:
-            roll = dfk.groupby(["Month","Category"], as_index=False)["Actual (€)"].sum()
-            roll["Month"] = pd.to_datetime(roll["Month"] + "-01")
+            roll = dfk.groupby(["Month","Category"], as_index=False, sort=False, observed=True)["Actual (€)"].sum()
+            roll["Month"] = pd.PeriodIndex(roll["Month"], freq="M")
             roll = roll.sort_values(["Category","Month"])
-            roll["Roll3"] = roll.groupby("Category")["Actual (€)"].rolling(3, min_periods=1).mean().reset_index(level=0, drop=True)
-            fig4, ax4 = plt.subplots()
+            roll["MonthStr"] = roll["Month"].astype(str)
+            roll["Roll3"] = roll.groupby("Category", sort=False, observed=True)["Actual (€)"].rolling(3, min_periods=1).mean().reset_index(level=0, drop=True)
+            lines = {}
             for cat in keycats:
-                sub = roll[roll["Category"]==cat]
-                ax4.plot(sub["Month"].dt.strftime("%Y-%m"), sub["Actual (€)"], label=f"{cat} Actual")
-                ax4.plot(sub["Month"].dt.strftime("%Y-%m"), sub["Roll3"], label=f"{cat} 3M Avg")
-            ax4.set_xlabel("Month")
-            ax4.set_ylabel("€")
-            ax4.legend()
-            plt.xticks(rotation=45)
-            st.pyplot(fig4)
+                sub = roll[roll["Category"]==cat].set_index("MonthStr")
+                lines[f"{cat} Actual"] = sub["Actual (€)"]
+                lines[f"{cat} 3M Avg"] = sub["Roll3"]
+            st.line_chart(pd.DataFrame(lines), x_label="Month", y_label="€")
         else:
             st.info("Add data for target categories to see rolling averages.")
 
         st.subheader("🗓️ Weekly Pace Tracker — current month")
         year, mon = map(int, cm.split("-"))
-        start = datetime(year, mon, 1)
-        end = datetime(year+1, 1, 1) if mon==12 else datetime(year, mon+1, 1)
-        days_in_month = (end - start).days
-        today_in_month = min((datetime.now() - start).days + 1, days_in_month)
+        days_in_month = calendar.monthrange(year, mon)[1]
+        today = date.today()
+        today_in_month = today.day if (today.year, today.month) == (year, mon) else days_in_month
         monthly_budget_total = exp_only["Budget (€)"].sum() if not exp_only.empty else 0
         spent_to_date = exp_only["Actual (€)"].sum() if not exp_only.empty else 0
         expected_spend_to_date = monthly_budget_total * (today_in_month / days_in_month) if days_in_month else 0
         st.write(f"Budget: {monthly_budget_total:,.0f}€ | Spent to date: {spent_to_date:,.0f}€ | Expected by today: {expected_spend_to_date:,.0f}€")
-        fig5, ax5 = plt.subplots()
-        ax5.bar(["Spent to date","Expected by today"], [spent_to_date, expected_spend_to_date])
-        ax5.set_ylabel("€")
-        st.pyplot(fig5)
+        ordered_bar_chart({"Spent to date": spent_to_date, "Expected by today": expected_spend_to_date})
 
         st.subheader("🚧 Guardrails & Caps")
         alerts = []
-        if monthly_budget_total > 0 and today_in_month < 20 and spent_to_date > 0.8 * monthly_budget_total:
+        caps = exp_only["Category"].astype(object).map(st.session_state.settings["hard_caps"]).fillna(0).to_numpy(dtype=np.float64)
+        overall_breach, cap_breach = guardrail_breaches(
+            exp_only["Budget (€)"].to_numpy(dtype=np.float64), exp_only["Actual (€)"].to_numpy(dtype=np.float64),
+            caps, today_in_month)
+        if overall_breach:
             alerts.append("Overall spending has reached 80% of the monthly budget before the 20th. Slow down now.")
-        caps = st.session_state.settings["hard_caps"]
-        if caps:
-            for cat, cap in caps.items():
-                spent_cat = exp_only.loc[exp_only["Category"]==cat, "Actual (€)"].sum()
-                if spent_cat > cap:
-                    alerts.append(f"Category '{cat}' exceeded its hard cap of {cap:,.0f}€. Consider a spending freeze.")
+        for cat, cap in zip(exp_only["Category"].to_numpy()[cap_breach], caps[cap_breach]):
+            alerts.append(f"Category '{cat}' exceeded its hard cap of {cap:,.0f}€. Consider a spending freeze.")
         for a in alerts:
             st.warning(a)
         if not alerts:
             st.success("No guardrail breaches detected.")
 
         st.subheader("🎯 Risk Guards")
+        spent_by_cat = col_dict(exp_only, "Category", "Actual (€)")
         for risk_cat, key in [("Trade","max_loss_limit_trade"), ("Bet","max_loss_limit_bet")]:
             limit = st.session_state.settings.get(key, 0)
-            spent_cat = dfm[(dfm["Type"]=="Expense") & (dfm["Category"]==risk_cat)]["Actual (€)"].sum()
+            spent_cat = spent_by_cat.get(risk_cat, 0)
             if limit and spent_cat > limit:
                 st.error(f"{risk_cat}: Loss limit of {limit:,.0f}€ exceeded. Pause activity.")
 
 # ---------- REPORTS TAB ----------
 with tabs[3]:
     st.header("Reports")
-    data = ensure_columns(st.session_state.data.copy())
     if data.empty:
         st.info("No data yet.")
     else:
-        monthly = aggregate_monthly(data)
+        monthly = cached_aggregate_monthly(data_key, data)
         if not monthly.empty:
-            fig_trend, ax_trend = plt.subplots()
-            ax_trend.plot(monthly["Month"], monthly["Income"], label="Income")
-            ax_trend.plot(monthly["Month"], monthly["Expense"], label="Expenses")
-            ax_trend.plot(monthly["Month"], monthly["Savings"], label="Savings")
-            ax_trend.set_xlabel("Month")
-            ax_trend.set_ylabel("€")
-            ax_trend.legend()
-            plt.xticks(rotation=45)
-            st.pyplot(fig_trend)
-
-        cm = current_month_key(data)
-        dfm = data[data["Month"]==cm].copy()
-        bmap = st.session_state.budgets.set_index("Category")["Monthly Budget (€)"].to_dict()
-        dfm["Budget (€)"] = dfm["Category"].map(bmap).fillna(dfm["Budget (€)"])
-        exp_only = dfm[dfm["Type"]=="Expense"].groupby("Category", as_index=False)[["Budget (€)","Actual (€)"]].sum()
+            st.line_chart(trend_chart_data(monthly), x_label="Month", y_label="€")
+
+        is_income, is_expense = label_mask(dfm, "Type", "Income"), label_mask(dfm, "Type", "Expense")
+        amounts = dfm["Actual (€)"].to_numpy()
+        month_income = amounts[is_income].sum(dtype=np.float64)
+        month_expenses = amounts[is_expense].sum(dtype=np.float64)
+        exp_only = dfm[is_expense].groupby("Category", as_index=False, sort=False, observed=True)[["Budget (€)","Actual (€)"]].sum()
         exp_only["Variance (€)"] = exp_only["Budget (€)"] - exp_only["Actual (€)"]
-        fig_var, ax_var = plt.subplots()
-        exp_sorted = exp_only.sort_values("Variance (€)")
-        ax_var.barh(exp_sorted["Category"], exp_sorted["Variance (€)"])
-        ax_var.axvline(0, linewidth=1)
-        ax_var.set_xlabel("€")
-        st.pyplot(fig_var)
-
-        fig_pie, ax_pie = plt.subplots()
+        st.vega_lite_chart(exp_only, VARIANCE_SPEC, use_container_width=True)
         if not exp_only.empty:
-            ax_pie.pie(exp_only["Actual (€)"], labels=exp_only["Category"], autopct="%1.1f%%", startangle=90)
-        ax_pie.axis("equal")
-        st.pyplot(fig_pie)
+            st.vega_lite_chart(exp_only, {
+                "mark": {"type": "arc"},
+                "encoding": {
+                    "theta": {"field": "Actual (€)", "type": "quantitative"},
+                    "color": {"field": "Category", "type": "nominal"},
+                },
+            })
 
-        month_income = dfm.loc[dfm["Type"]=="Income","Actual (€)"].sum()
-        month_expenses = dfm.loc[dfm["Type"]=="Expense","Actual (€)"].sum()
         month_savings = month_income - month_expenses
         month_savings_rate = (month_savings / month_income * 100) if month_income>0 else 0
         overs = exp_only[exp_only["Variance (€)"]<0].sort_values("Variance (€)").head(5)
@@ -341,34 +438,39 @@ with tabs[3]:
         if not REPORTLAB_OK:
             st.warning("Install reportlab to enable PDF export: `pip install reportlab`")
         else:
-            trend_png = fig_to_png_bytes(fig_trend) if 'fig_trend' in locals() else None
-            var_png = fig_to_png_bytes(fig_var)
-            pie_png = fig_to_png_bytes(fig_pie)
             if st.button("Generate Monthly PDF"):
+                from reportlab.lib.pagesizes import A4
+                from reportlab.pdfgen import canvas
+                from reportlab.lib.units import cm as CM  # cm is the month key here
+                from reportlab.lib.utils import ImageReader
+                trend_png = report_chart_png(frame_key(monthly), "trend", monthly) if not monthly.empty else None
+                exp_key = frame_key(exp_only)
+                var_png = report_chart_png(exp_key, "variance", exp_only)
+                pie_png = report_chart_png(exp_key, "pie", exp_only)
                 buf = BytesIO()
                 c = canvas.Canvas(buf, pagesize=A4)
                 width, height = A4
 
                 c.setFont("Helvetica-Bold", 16)
-                c.drawString(2*cm, height-2*cm, f"Budget Report — {cm}")
+                c.drawString(2*CM, height-2*CM, f"Budget Report — {cm}")
 
                 c.setFont("Helvetica", 10)
                 kpi = f"Income: {month_income:,.0f}€   Expenses: {month_expenses:,.0f}€   Savings: {month_savings:,.0f}€ ({month_savings_rate:.1f}%)"
-                c.drawString(2*cm, height-3*cm, kpi)
+                c.drawString(2*CM, height-3*CM, kpi)
 
-                y = height - 4*cm
-                chart_w = width - 4*cm
-                chart_h = 6*cm
+                y = height - 4*CM
+                chart_w = width - 4*CM
+                chart_h = 6*CM
                 if trend_png:
-                    c.drawImage(ImageReader(BytesIO(trend_png)), 2*cm, y-chart_h, width=chart_w, height=chart_h, preserveAspectRatio=True, mask='auto')
-                    y -= (chart_h + 1*cm)
-                c.drawImage(ImageReader(BytesIO(var_png)), 2*cm, y-chart_h, width=chart_w, height=chart_h, preserveAspectRatio=True, mask='auto')
-                y -= (chart_h + 1*cm)
-                c.drawImage(ImageReader(BytesIO(pie_png)), 2*cm, y-chart_h, width=chart_w, height=chart_h, preserveAspectRatio=True, mask='auto')
+                    c.drawImage(ImageReader(BytesIO(trend_png)), 2*CM, y-chart_h, width=chart_w, height=chart_h, preserveAspectRatio=True, mask='auto')
+                    y -= (chart_h + 1*CM)
+                c.drawImage(ImageReader(BytesIO(var_png)), 2*CM, y-chart_h, width=chart_w, height=chart_h, preserveAspectRatio=True, mask='auto')
+                y -= (chart_h + 1*CM)
+                c.drawImage(ImageReader(BytesIO(pie_png)), 2*CM, y-chart_h, width=chart_w, height=chart_h, preserveAspectRatio=True, mask='auto')
 
                 c.showPage()
                 c.setFont("Helvetica-Bold", 14)
-                c.drawString(2*cm, height-2*cm, "Recommendations")
+                c.drawString(2*CM, height-2*CM, "Recommendations")
                 c.setFont("Helvetica", 11)
                 text = []
                 goal_gap = st.session_state.settings.get("savings_goal",0) - month_savings
@@ -379,7 +481,7 @@ with tabs[3]:
                 subs_rows = exp_only[exp_only["Category"].str.contains("Subs", case=False, na=False)]
                 if not subs_rows.empty:
                     text.append(f"Subscriptions total {subs_rows['Actual (€)'].sum():,.0f}€. Cancel/pause one for 60 days.")
-                tx = c.beginText(2*cm, height-3*cm)
+                tx = c.beginText(2*CM, height-3*CM)
                 for line in text if text else ["No immediate risks. Keep your plan."]:
                     tx.textLine(f"- {line}")
                 c.drawText(tx)